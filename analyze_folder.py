@@ -1,66 +1,230 @@
 import os
 import sys
 import argparse
+import queue
+import threading
 from pathlib import Path
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-from shared_utils import format_size
+from shared_utils import format_size, scandir_recursive
 
 # A set of common text file extensions for quick lookups. Case-insensitive.
-KNOWN_TEXT_EXTENSIONS = {
+KNOWN_TEXT_EXTENSIONS = frozenset({
     '.txt', '.md', '.py', '.js', '.ts', '.tsx', '.jsx', '.html', '.css', 
     '.scss', '.json', '.yml', '.yaml', '.xml', '.csv', '.sh', '.bat', 
     '.ps1', '.ini', '.cfg', '.conf', '.log', 'dockerfile', '.sql'
-}
+})
+
+# "Is Text?" column labels, indexed by the membership test result.
+_YES_NO = ("No", "Yes")
+
+# Extension keys are interned so the per-file dict lookup can match on identity.
+_NO_EXT_SENTINEL = sys.intern('(no extension)')
+_DOCKERFILE_INTERNED = sys.intern('dockerfile')
+
+# Subdirectories are only walked in parallel when the root has more entries than this.
+PARALLEL_MIN_ENTRIES = 4
+
+# Report column widths, and the row template and separator built from them once.
+TYPE_W, SIZE_W, COUNT_W, TEXT_W, FILE_W = 15, 12, 8, 10, 50
+ROW_FMT = f"{{:<{TYPE_W}}} | {{:>{SIZE_W}}} | {{:>{COUNT_W}}} | {{:>{TEXT_W}}} | {{:<{FILE_W}}}"
+SEP_LINE = f"{'-'*TYPE_W}-+-{'-'*SIZE_W}-+-{'-'*COUNT_W}-+-{'-'*TEXT_W}-+-{'-'*FILE_W}"
+
+# Bounds for the scandir prefetch pipeline: files per batch and batches in flight.
+PREFETCH_BATCH_SIZE = 256
+PREFETCH_QUEUE_SIZE = 64
+
+# Whether directories can be scanned and opened relative to an open directory fd (POSIX).
+_SCANDIR_FD = os.scandir in os.supports_fd and os.open in os.supports_dir_fd
+
+def _walk_file_sizes(path, parent_fd=None):
+    """
+    Recursively yields a (directory, name, size) tuple for every regular file under path.
+    On POSIX each directory is opened once and scanned through its fd, so every stat
+    is an fstatat relative to that fd rather than a path walk from the root.
+    """
+    if not _SCANDIR_FD:
+        for entry in scandir_recursive(path):
+            try:
+                yield os.path.dirname(entry.path), entry.name, entry.stat().st_size
+            except (PermissionError, FileNotFoundError) as e:
+                print(f"⚠️  Skipping due to error: {e}")
+        return
+
+    try:
+        if parent_fd is None:
+            dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        else:
+            dir_fd = os.open(os.path.basename(path), os.O_RDONLY | os.O_DIRECTORY, dir_fd=parent_fd)
+    except OSError as e:
+        # Relative to dir_fd the error only names the basename, so report the full path.
+        print(f"⚠️  Skipping due to error: {e.strerror}: '{path}'")
+        return
+    try:
+        # Entries are listed and the scandir handle (a duplicate of dir_fd) is closed
+        # before recursing, so each directory level holds only one fd open.
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(dir_fd) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append((path, entry.name, entry.stat(follow_symlinks=False).st_size))
+                    except (PermissionError, FileNotFoundError) as e:
+                        # Under scandir(fd), entry.path is only the bare name.
+                        print(f"⚠️  Skipping due to error: {e.strerror}: '{os.path.join(path, entry.name)}'")
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"⚠️  Skipping due to error: {e.strerror}: '{path}'")
+
+        yield from files
+        for name in subdirs:
+            yield from _walk_file_sizes(os.path.join(path, name), dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def _produce_batches(path, batches: queue.Queue):
+    """Producer thread body: walks path and queues file batches, then a None sentinel."""
+    try:
+        batch = []
+        for file_info in _walk_file_sizes(path):
+            batch.append(file_info)
+            if len(batch) >= PREFETCH_BATCH_SIZE:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+    finally:
+        batches.put(None)
+
+def _prefetched_files(path):
+    """
+    Yields the same tuples as _walk_file_sizes, but the walk runs on a producer
+    thread so the next getdents/stat calls overlap with the caller's accumulation.
+    """
+    batches = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+    producer = threading.Thread(target=_produce_batches, args=(path, batches), daemon=True)
+    producer.start()
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        yield from batch
+    producer.join()
+
+def _accumulate(files, file_stats: dict) -> int:
+    """
+    Folds (directory, name, size) tuples into file_stats and returns the number of files counted.
+    Each value is a (total_size, count, largest_file_size, largest_file_path) tuple;
+    one tuple store per file is cheaper than updating four dict items.
+    """
+    fs = file_stats
+    fs_get = fs.get
+    intern = sys.intern
+    join = os.path.join
+    files_counted = 0
+    for dirpath, name, size in files:
+        files_counted += 1
+        dot = name.rfind('.')
+        # Same rule as Path.suffix: a leading or trailing dot is not an extension.
+        if 0 < dot < len(name) - 1:
+            extension = intern(name[dot:].lower())
+        elif dot < 0 and name.lower() == 'dockerfile':
+            # Only a name without any dot can be a Dockerfile, so most files skip lower().
+            extension = _DOCKERFILE_INTERNED
+        else:
+            extension = _NO_EXT_SENTINEL
+
+        # The full path is only joined when the file becomes the largest of its type.
+        cur = fs_get(extension)
+        if cur is None:
+            fs[extension] = (size, 1, size, join(dirpath, name))
+        elif size > cur[2]:
+            fs[extension] = (cur[0] + size, cur[1] + 1, size, join(dirpath, name))
+        else:
+            fs[extension] = (cur[0] + size, cur[1] + 1, cur[2], cur[3])
+    return files_counted
+
+def _walk_subtree(path):
+    """
+    Scans one subtree into its own stats dict so it can run on a worker thread.
+    Pool workers already overlap with each other, so no prefetch thread is started here.
+    """
+    local_stats = {}
+    files_counted = _accumulate(_walk_file_sizes(path), local_stats)
+    return local_stats, files_counted
+
+def _merge_stats(file_stats: dict, other_stats: dict):
+    """
+    Merges per-subtree stats into file_stats.
+    When largest sizes tie, the file already in file_stats is kept, so subtrees must be
+    merged in a fixed order for the "Largest File Example" column to be deterministic.
+    """
+    for extension, other in other_stats.items():
+        cur = file_stats.get(extension)
+        if cur is None:
+            file_stats[extension] = other
+        elif other[2] > cur[2]:
+            file_stats[extension] = (cur[0] + other[0], cur[1] + other[1], other[2], other[3])
+        else:
+            file_stats[extension] = (cur[0] + other[0], cur[1] + other[1], cur[2], cur[3])
 
 def analyze_directory(root_path: Path):
     """
     Analyzes files recursively, grouping them by type, summing their sizes,
     and finding the largest file of each type.
+    Immediate subdirectories are walked in parallel on a thread pool; the work is
+    syscall-bound, so the GIL is released while threads wait on the filesystem.
     """
-    # Use defaultdict with a factory function for a more complex data structure.
-    # The value for each extension will be a dictionary holding all relevant stats.
-    def stats_factory():
-        return {
-            'total_size': 0,
-            'count': 0,
-            'largest_file_size': -1,
-            'largest_file_path': None
-        }
-    file_stats = defaultdict(stats_factory)
+    file_stats = {}
     
     print(f"🔍 Scanning directory: {root_path}...")
 
-    files_generator = root_path.rglob('*')
-    
-    total_files_scanned = 0
-    for path in files_generator:
+    try:
+        with os.scandir(root_path) as it:
+            top_entries = list(it)
+    except OSError as e:
+        print(f"⚠️  Skipping due to error: {e}")
+        top_entries = []
+
+    root_str = str(root_path)
+    top_files = []
+    top_dirs = []
+    for entry in top_entries:
         try:
-            if path.is_file():
-                total_files_scanned += 1
-                extension = path.suffix.lower() if path.suffix else '(no extension)'
-                if path.name.lower() == 'dockerfile':
-                    extension = 'dockerfile'
-
-                size = path.stat().st_size
-                stats_for_ext = file_stats[extension]
-                
-                # Update aggregate stats
-                stats_for_ext['total_size'] += size
-                stats_for_ext['count'] += 1
-                
-                # Check if this is the largest file of its type so far
-                if size > stats_for_ext['largest_file_size']:
-                    stats_for_ext['largest_file_size'] = size
-                    stats_for_ext['largest_file_path'] = path
-        
+            if entry.is_dir(follow_symlinks=False):
+                top_dirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                top_files.append((root_str, entry.name, entry.stat(follow_symlinks=False).st_size))
         except (PermissionError, FileNotFoundError) as e:
             print(f"⚠️  Skipping due to error: {e}")
+        except OSError:
+            continue
+
+    total_files_scanned = _accumulate(top_files, file_stats)
+
+    # Thread start-up costs more than it saves on tiny directories.
+    if len(top_entries) > PARALLEL_MIN_ENTRIES:
+        with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4) as executor:
+            futures = [executor.submit(_walk_subtree, d) for d in top_dirs]
+            # Merge in submission order (walks still run in parallel) so ties resolve the same way every run.
+            for future in futures:
+                sub_stats, files_counted = future.result()
+                _merge_stats(file_stats, sub_stats)
+                total_files_scanned += files_counted
+    else:
+        # Without the pool, a producer thread overlaps the walk with accumulation.
+        for d in top_dirs:
+            total_files_scanned += _accumulate(_prefetched_files(d), file_stats)
 
     print(f"✅ Scan complete. Found {total_files_scanned} files.")
     
     # Sort the dictionary items by total size in descending order
-    sorted_stats = sorted(file_stats.items(), key=lambda item: item[1]['total_size'], reverse=True)
+    sorted_stats = sorted(file_stats.items(), key=lambda item: item[1][0], reverse=True)
     
     return sorted_stats
 
@@ -70,51 +234,36 @@ def print_report(stats: list, root_path: Path):
         print("\nNo files found to analyze.")
         return
 
-    # Define column widths
-    type_w, size_w, count_w, text_w, file_w = 15, 12, 8, 10, 50
-
     print("\n--- Folder Content Analysis Report ---")
-    header = (
-        f"{'File Type':<{type_w}} | {'Total Size':>{size_w}} | {'Count':>{count_w}} | "
-        f"{'Is Text?':>{text_w}} | {'Largest File Example':<{file_w}}"
-    )
-    print(header)
-    print(f"{'-'*type_w}-+-{'-'*size_w}-+-{'-'*count_w}-+-{'-'*text_w}-+-{'-'*file_w}")
+    print(ROW_FMT.format('File Type', 'Total Size', 'Count', 'Is Text?', 'Largest File Example'))
+    print(SEP_LINE)
 
     total_size = 0
     total_count = 0
+    root_str = str(root_path)
+    row_format = ROW_FMT.format
 
-    for ext, ext_stats in stats:
-        total_size += ext_stats['total_size']
-        total_count += ext_stats['count']
+    for ext, (ext_size, ext_count, _, largest_path) in stats:
+        total_size += ext_size
+        total_count += ext_count
         
-        formatted_size = format_size(ext_stats['total_size'])
-        is_text = "Yes" if ext in KNOWN_TEXT_EXTENSIONS else "No"
+        formatted_size = format_size(ext_size)
+        is_text = _YES_NO[ext in KNOWN_TEXT_EXTENSIONS]
         
-        # Get and format the largest file path
-        largest_path = ext_stats['largest_file_path']
+        # Format the largest file path
         if largest_path:
-            relative_path_str = str(largest_path.relative_to(root_path))
+            relative_path_str = os.path.relpath(largest_path, root_str)
             # Truncate long paths to fit the column
-            if len(relative_path_str) > file_w:
-                relative_path_str = "..." + relative_path_str[-(file_w - 3):]
+            if len(relative_path_str) > FILE_W:
+                relative_path_str = "..." + relative_path_str[-(FILE_W - 3):]
         else:
             relative_path_str = "N/A"
             
-        row = (
-            f"{ext:<{type_w}} | {formatted_size:>{size_w}} | {ext_stats['count']:>{count_w}} | "
-            f"{is_text:>{text_w}} | {relative_path_str:<{file_w}}"
-        )
-        print(row)
+        print(row_format(ext, formatted_size, ext_count, is_text, relative_path_str))
 
     # Footer
-    print(f"{'-'*type_w}-+-{'-'*size_w}-+-{'-'*count_w}-+-{'-'*text_w}-+-{'-'*file_w}")
-    formatted_total_size = format_size(total_size)
-    footer = (
-        f"{'TOTAL':<{type_w}} | {formatted_total_size:>{size_w}} | {total_count:>{count_w}} | "
-        f"{'':>{text_w}} | {'':<{file_w}}"
-    )
-    print(footer)
+    print(SEP_LINE)
+    print(row_format('TOTAL', format_size(total_size), total_count, '', ''))
 
 
 if __name__ == "__main__":
@@ -4,17 +4,94 @@ import os
 import sys
 import ast
 import argparse
-from collections import deque
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import List, Set
 
 from shared_utils import summary, write_concatenated_artifact
 
+# Waves smaller than this are parsed in-process; process start-up and seeding
+# each worker with the pre-scan would cost more than the parsing saves.
+PARALLEL_PARSE_MIN_FILES = 8
+
+# Resolved search folder, keyed by the folder string as given on the command line.
+_SEARCH_REAL = {}
+
+def _real_search_folder(search_folder: str) -> str:
+    """Returns the realpath of search_folder, resolving it only once per folder."""
+    abs_search_folder = _SEARCH_REAL.get(search_folder)
+    if abs_search_folder is None:
+        abs_search_folder = _SEARCH_REAL.setdefault(search_folder, os.path.realpath(search_folder))
+    return abs_search_folder
+
+# Every .py file under each search folder, keyed like _SEARCH_REAL. Membership
+# tests against this set replace per-candidate os.path.isfile probes.
+_LOCAL_PY_FILES = {}
+
+def _scan_py_files(path: str, abs_search_folder: str, ancestors: set, found: set):
+    """
+    Adds every .py file under path to found, using the paths as they are walked.
+    Directory symlinks are followed when their target stays inside the search folder,
+    so imports through them resolve like they did with os.path.isfile. ancestors holds
+    the (st_dev, st_ino) of the directories on the current walk; a link back to one of
+    them is a cycle and is not followed.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"Warning: Could not scan '{path}'. Skipping. Error: {e}", file=sys.stderr)
+        return
+
+    search_prefix = abs_search_folder.rstrip(os.sep) + os.sep
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                if entry.is_symlink() and not os.path.realpath(entry.path).startswith(search_prefix):
+                    continue
+                st = entry.stat()
+                dir_key = (st.st_dev, st.st_ino)
+                if dir_key in ancestors:
+                    continue
+                ancestors.add(dir_key)
+                _scan_py_files(entry.path, abs_search_folder, ancestors, found)
+                ancestors.discard(dir_key)
+            elif entry.name.endswith('.py') and entry.is_file():
+                found.add(entry.path)
+        except OSError:
+            continue
+
+def _local_py_files(search_folder: str) -> frozenset:
+    """Walks search_folder once and returns the set of .py file paths found under its realpath."""
+    py_files = _LOCAL_PY_FILES.get(search_folder)
+    if py_files is None:
+        abs_search_folder = _real_search_folder(search_folder)
+        found = set()
+        try:
+            st = os.stat(abs_search_folder)
+            _scan_py_files(abs_search_folder, abs_search_folder, {(st.st_dev, st.st_ino)}, found)
+        except OSError as e:
+            print(f"Warning: Could not scan '{abs_search_folder}'. Skipping. Error: {e}", file=sys.stderr)
+        py_files = frozenset(found)
+        _LOCAL_PY_FILES[search_folder] = py_files
+    return py_files
+
+@functools.lru_cache(maxsize=None)
 def is_local_module(module_path: str, search_folder: str) -> bool:
-    """Check if a resolved module path is within the specified search folder."""
-    abs_search_folder = os.path.realpath(search_folder)
+    """
+    Check if a resolved module path is within the specified search folder.
+    Memoized: the same file is often reached from imports in many directories.
+    """
+    abs_search_folder = _real_search_folder(search_folder)
     abs_module_path = os.path.realpath(module_path)
-    return os.path.commonpath([abs_search_folder, abs_module_path]) == abs_search_folder
+    return abs_module_path.startswith(abs_search_folder.rstrip(os.sep) + os.sep)
+
+def _is_local_file(candidate: str, search_folder: str) -> bool:
+    """Check a candidate path against the pre-scanned file set instead of the filesystem."""
+    return candidate in _local_py_files(search_folder) and is_local_module(candidate, search_folder)
 
+@functools.lru_cache(maxsize=None)
 def resolve_import_path(module_name: str, current_file_dir: str, search_folder: str, level: int = 0) -> str or None:
     """Resolve an import name into a potential file or package path."""
     base_path = ""
@@ -23,103 +100,129 @@ def resolve_import_path(module_name: str, current_file_dir: str, search_folder:
         for _ in range(level - 1):
             base_path = os.path.dirname(base_path)
     else:
-        base_path = search_folder
+        # Candidates are built from the realpath so they match _local_py_files entries.
+        base_path = _real_search_folder(search_folder)
 
     rel_path_parts = module_name.split('.')
     
     potential_path_py = os.path.join(base_path, *rel_path_parts) + '.py'
-    if os.path.isfile(potential_path_py) and is_local_module(potential_path_py, search_folder):
+    if _is_local_file(potential_path_py, search_folder):
         return os.path.realpath(potential_path_py)
     
     potential_path_pkg = os.path.join(base_path, *rel_path_parts, '__init__.py')
-    if os.path.isfile(potential_path_pkg) and is_local_module(potential_path_pkg, search_folder):
+    if _is_local_file(potential_path_pkg, search_folder):
         return os.path.realpath(potential_path_pkg)
         
-    if level == 0 and rel_path_parts[0] == os.path.basename(os.path.realpath(search_folder)):
+    if level == 0 and rel_path_parts[0] == os.path.basename(base_path):
         fallback_parts = rel_path_parts[1:]
         if fallback_parts:
             fb_path_py = os.path.join(base_path, *fallback_parts) + '.py'
-            if os.path.isfile(fb_path_py) and is_local_module(fb_path_py, search_folder):
+            if _is_local_file(fb_path_py, search_folder):
                 return os.path.realpath(fb_path_py)
             
             fb_path_pkg = os.path.join(base_path, *fallback_parts, '__init__.py')
-            if os.path.isfile(fb_path_pkg) and is_local_module(fb_path_pkg, search_folder):
+            if _is_local_file(fb_path_pkg, search_folder):
                 return os.path.realpath(fb_path_pkg)
         else:
             fb_path_pkg = os.path.join(base_path, '__init__.py')
-            if os.path.isfile(fb_path_pkg) and is_local_module(fb_path_pkg, search_folder):
+            if _is_local_file(fb_path_pkg, search_folder):
                 return os.path.realpath(fb_path_pkg)
                 
     return None
 
-class ImportVisitor(ast.NodeVisitor):
-    """AST visitor to find all local import statements."""
-    def __init__(self, current_file_path: str, search_folder: str):
-        self.current_file_dir = os.path.dirname(current_file_path)
-        self.search_folder = search_folder
-        self.dependencies = set()
-
-    def visit_Import(self, node):
-        for alias in node.names:
-            module_path = resolve_import_path(alias.name, self.current_file_dir, self.search_folder)
-            if module_path:
-                self.dependencies.add(module_path)
-        self.generic_visit(node)
-
-    def visit_ImportFrom(self, node):
-        # [THE FIX] A much simpler and more robust approach.
-        if not node.module:
-            # Handles relative imports like `from . import foo`
-            # Here, the module is the package containing the current file.
-            module_base_name = ''
-        else:
-            module_base_name = node.module
+def extract_imports(tree: ast.AST, current_file_dir: str, search_folder: str) -> Set[str]:
+    """
+    Finds all local import statements in a parsed module.
+    A single ast.walk with isinstance checks avoids NodeVisitor's per-node method dispatch.
+    """
+    dependencies = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                module_path = resolve_import_path(alias.name, current_file_dir, search_folder)
+                if module_path:
+                    dependencies.add(module_path)
+
+        elif isinstance(node, ast.ImportFrom):
+            # [THE FIX] A much simpler and more robust approach.
+            if not node.module:
+                # Handles relative imports like `from . import foo`
+                # Here, the module is the package containing the current file.
+                module_base_name = ''
+            else:
+                module_base_name = node.module
+
+            # For each name in the import (e.g., 'speaker_mgr' in 'from worker.module import speaker_mgr')
+            for alias in node.names:
+                # Try to resolve the most specific path first.
+                # e.g., 'worker.module.speaker_mgr'
+                full_module_name = f"{module_base_name}.{alias.name}" if module_base_name else alias.name
+                
+                resolved_path = resolve_import_path(full_module_name, current_file_dir, search_folder, node.level)
+                if resolved_path:
+                    dependencies.add(resolved_path)
+
+            # Always try to resolve the base module as well (e.g., 'worker.module')
+            if module_base_name:
+                base_path = resolve_import_path(module_base_name, current_file_dir, search_folder, node.level)
+                if base_path:
+                    dependencies.add(base_path)
+
+    return dependencies
 
-        # For each name in the import (e.g., 'speaker_mgr' in 'from worker.module import speaker_mgr')
-        for alias in node.names:
-            # Try to resolve the most specific path first.
-            # e.g., 'worker.module.speaker_mgr'
-            full_module_name = f"{module_base_name}.{alias.name}" if module_base_name else alias.name
-            
-            resolved_path = resolve_import_path(full_module_name, self.current_file_dir, self.search_folder, node.level)
-            if resolved_path:
-                self.dependencies.add(resolved_path)
 
-        # Always try to resolve the base module as well (e.g., 'worker.module')
-        if module_base_name:
-            base_path = resolve_import_path(module_base_name, self.current_file_dir, self.search_folder, node.level)
-            if base_path:
-                self.dependencies.add(base_path)
+def _init_worker(search_folder: str, abs_search_folder: str, py_files: frozenset):
+    """Seeds a worker process with the parent's pre-scan so it never re-walks the folder."""
+    _SEARCH_REAL[search_folder] = abs_search_folder
+    _LOCAL_PY_FILES[search_folder] = py_files
 
-        self.generic_visit(node)
+def parse_and_extract_imports(current_file: str, search_folder: str) -> Set[str]:
+    """Parses one file and returns the local dependencies it imports. Runs in a worker process."""
+    try:
+        with open(current_file, 'r', encoding='utf-8') as f:
+            source_code = f.read()
+            tree = ast.parse(source_code, filename=current_file)
+    except (IOError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"Warning: Could not read or parse '{current_file}'. Skipping. Error: {e}", file=sys.stderr)
+        return set()
 
+    return extract_imports(tree, os.path.dirname(current_file), search_folder)
 
 def find_all_dependencies(start_scripts: List[str], search_folder: str) -> Set[str]:
-    """Finds all local dependencies for the starting scripts, searching recursively."""
+    """
+    Finds all local dependencies for the starting scripts, searching recursively.
+    The search is breadth-first in waves. Small waves are parsed in-process; larger
+    ones go to worker processes, since ast.parse is CPU-bound. The pool is only
+    started on the first large wave, so small projects never pay for it.
+    """
     initial_paths = {os.path.realpath(p) for p in start_scripts}
-    to_process = deque(initial_paths)
+    # Pre-scan once so import resolution is a set lookup rather than stat calls.
+    py_files = _local_py_files(search_folder)
+    wave = list(initial_paths)
     all_found_dependencies = set(initial_paths)
+    executor = None
+    cpu_count = os.cpu_count() or 1
     
-    while to_process:
-        current_file = to_process.popleft()
-        
-        try:
-            with open(current_file, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-                tree = ast.parse(source_code, filename=current_file)
-        except (IOError, SyntaxError, UnicodeDecodeError) as e:
-            print(f"Warning: Could not read or parse '{current_file}'. Skipping. Error: {e}", file=sys.stderr)
-            continue
-            
-        visitor = ImportVisitor(current_file, search_folder)
-        visitor.visit(tree)
-        
-        new_dependencies = visitor.dependencies - all_found_dependencies
-        for dep in new_dependencies:
-            all_found_dependencies.add(dep)
-            # Only add actual files to the processing queue
-            if os.path.isfile(dep):
-                 to_process.append(dep)
+    try:
+        while wave:
+            if len(wave) < PARALLEL_PARSE_MIN_FILES or cpu_count < 2:
+                results = [parse_and_extract_imports(path, search_folder) for path in wave]
+            else:
+                if executor is None:
+                    executor = ProcessPoolExecutor(
+                        max_workers=min(cpu_count, len(wave)),
+                        initializer=_init_worker,
+                        initargs=(search_folder, _real_search_folder(search_folder), py_files)
+                    )
+                results = executor.map(parse_and_extract_imports, wave, repeat(search_folder))
+            found = set().union(*results)
+            new_dependencies = found - all_found_dependencies
+            all_found_dependencies |= new_dependencies
+            # Only add actual files to the next wave
+            wave = [dep for dep in new_dependencies if os.path.isfile(dep)]
+    finally:
+        if executor is not None:
+            executor.shutdown()
             
     return all_found_dependencies
 
@@ -1,10 +1,68 @@
 #!/usr/bin/env python3
 import argparse
+import shlex
+import subprocess
 import sys
 import os
 
 from shared_utils import summary, format_size, run_command
 
+# Git expands %x01 to HEADER_MARKER, which prefixes each commit header in
+# `git log -z` output so it cannot be mistaken for a path.
+HEADER_MARKER = '\x01'
+LOG_FORMAT = "--format=%x01%h %s"
+
+def parse_log_output(log_output):
+    """
+    Splits `git log -z --name-only` output into a oneline-style history string
+    and the sorted, de-duplicated list of files changed across those commits.
+    """
+    history_lines = []
+    changed_files = set()
+    for token in log_output.split('\0'):
+        # The first path of each commit follows its header after a newline.
+        token = token.lstrip('\n')
+        if token.startswith(HEADER_MARKER):
+            history_lines.append(token[len(HEADER_MARKER):])
+        elif token:
+            changed_files.add(token)
+    return "\n".join(history_lines), sorted(changed_files)
+
+def read_files_at_commit(commit, file_paths):
+    """
+    Returns the contents of each path as of the given commit, in order, with
+    None for paths that do not exist there. A single `git cat-file --batch`
+    process serves every path, instead of one `git show` process per file.
+    """
+    contents = []
+    # Popen's context manager closes stdout before stdin and then waits, so an early
+    # exit cannot leave cat-file blocked on a full pipe or skip the wait.
+    with subprocess.Popen(["git", "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE) as proc:
+        for file_path in file_paths:
+            proc.stdin.write(f"{commit}:{file_path}\n".encode('utf-8'))
+            proc.stdin.flush()
+            # Response header is "<sha> <type> <size>", or "<object> missing" for deleted paths.
+            header = proc.stdout.readline().decode('utf-8', errors='replace').rstrip('\n')
+            parts = header.split(' ')
+            if len(parts) != 3 or not parts[2].isdigit():
+                contents.append(None)
+                continue
+            data = proc.stdout.read(int(parts[2]))
+            proc.stdout.read(1)  # Trailing newline after the object body
+            contents.append(data.decode('utf-8', errors='replace').strip())
+    return contents
+
+def paths_present_at_commit(commit, file_paths):
+    """Returns the subset of file_paths that exist in the given commit, via one `git cat-file --batch-check`."""
+    request = "".join(f"{commit}:{file_path}\n" for file_path in file_paths).encode('utf-8')
+    result = subprocess.run(["git", "cat-file", "--batch-check"], input=request, capture_output=True)
+    # One response line per request line: "<sha> <type> <size>", or "<object> missing".
+    responses = result.stdout.decode('utf-8', errors='replace').splitlines()
+    return {
+        file_path for file_path, response in zip(file_paths, responses)
+        if not response.endswith(' missing') and len(response.split(' ')) == 3
+    }
+
 def main():
     """
     Main function to parse arguments and generate the output file.
@@ -37,38 +95,43 @@ This script can operate in two modes:\n
     is_single_commit_mode = (base_commit == this_commit)
 
     if is_single_commit_mode:
-        short_this_id = run_command(f"git rev-parse --short {this_commit}")
+        short_this_id = run_command(["git", "rev-parse", "--short", this_commit])
         output_filename = f"{short_this_id}.txt"
-        history_command = f"git log --oneline -n 1 {this_commit}"
-        files_changed_command = f"git diff --name-only {this_commit}^ {this_commit}"
+        log_command = ["git", "show", "-z", "--name-only", "--diff-merges=first-parent", LOG_FORMAT, this_commit]
         files_header = f"=== CHANGED FILES AND THEIR CONTENTS (in commit {short_this_id}) ===\n"
     else:
-        short_base_id = run_command(f"git rev-parse --short {base_commit}")
-        short_this_id = run_command(f"git rev-parse --short {this_commit}")
+        short_base_id = run_command(["git", "rev-parse", "--short", base_commit])
+        short_this_id = run_command(["git", "rev-parse", "--short", this_commit])
         output_filename = f"{short_base_id}-{short_this_id}.txt"
-        history_command = f"git log --oneline {base_commit}..{this_commit}"
-        files_changed_command = f"git diff --name-only {base_commit} {this_commit}"
+        log_command = ["git", "log", "-z", "--name-only", "--diff-merges=first-parent", LOG_FORMAT, f"{base_commit}..{this_commit}"]
         files_header = f"=== CHANGED FILES AND THEIR CONTENTS (between commits {short_base_id} and {short_this_id}) ===\n"
 
-    # 1. Get the git history.
-    git_history = run_command(history_command)
-
-    # 2. Get the list of changed files.
-    changed_files_str = run_command(files_changed_command)
-    changed_files = changed_files_str.splitlines() if changed_files_str else []
+    # Get the git history and the list of changed files from a single git process.
+    git_history, changed_files = parse_log_output(run_command(log_command))
 
     file_data = []
     
     # Read file contents BEFORE opening the output file to generate the summary first
-    for file_path in changed_files:
-        try:
-            file_content_command = f"git show {this_commit}:{file_path}"
-            file_content = run_command(file_content_command)
+    try:
+        file_contents = read_files_at_commit(this_commit, changed_files)
+        missing_files = [fp for fp, content in zip(changed_files, file_contents) if content is None]
+        if missing_files and not is_single_commit_mode:
+            # Paths touched inside the range but absent at both ends (renamed away,
+            # or added then deleted) are not part of the net change; drop them.
+            existed_at_base = paths_present_at_commit(base_commit, missing_files)
+        else:
+            existed_at_base = set(missing_files)
+        for file_path, file_content in zip(changed_files, file_contents):
+            if file_content is None:
+                if file_path not in existed_at_base:
+                    continue
+                # Deleted files keep a note in the output but add nothing to the size totals.
+                file_data.append((file_path, f"fatal: path '{file_path}' does not exist in '{this_commit}'", 0))
+                continue
             size = len(file_content.encode('utf-8', errors='replace'))
-        except Exception as e:
-            file_content = f'{e}'
-            size = 0
-        file_data.append((file_path, file_content, size))
+            file_data.append((file_path, file_content, size))
+    except Exception as e:
+        file_data = [(file_path, f'{e}', 0) for file_path in changed_files]
 
     commit_id_str = short_this_id if is_single_commit_mode else f"{short_base_id}..{short_this_id}"
     
@@ -86,7 +149,7 @@ This script can operate in two modes:\n
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(summary_text + "\n")
             f.write("=== GIT HISTORY ===\n")
-            f.write(history_command + '\n\n')
+            f.write(shlex.join(log_command) + '\n\n')
             f.write(git_history)
             f.write("\n\n" + "====================" + "\n\n")
 
@@ -94,7 +157,6 @@ This script can operate in two modes:\n
                 f.write("No files were changed in the specified commit(s).\n")
             else:
                 f.write(files_header)
-                f.write(files_changed_command + '\n')
                 for path, content, size in file_data:
                     f.write("\n" + "===" + f" FILE: {path} (Size: {format_size(size)}) " + "===" + "\n")
                     f.write(content)
@@ -1,25 +1,51 @@
+import os
+import shutil
 import subprocess
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+_POWER_LABELS = ('B', 'KB', 'MB', 'GB', 'TB')
+
 def format_size(size_bytes: int) -> str:
     """Converts a size in bytes to a human-readable string (KB, MB, GB)."""
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0 B"
-    power = 1024
-    n = 0
-    power_labels = {0: 'B', 1: 'KB', 2: 'MB', 3: 'GB', 4: 'TB'}
-    while size_bytes >= power and n < len(power_labels) - 1:
-        size_bytes /= power
-        n += 1
-    return f"{size_bytes:.2f} {power_labels[n]}" if n > 0 else f"{int(size_bytes)} {power_labels[n]}"
+    # bit_length gives the power of 1024 directly, without a division loop.
+    n = min((size_bytes.bit_length() - 1) // 10, len(_POWER_LABELS) - 1)
+    if n == 0:
+        return f"{size_bytes} B"
+    return f"{size_bytes / (1 << (10 * n)):.2f} {_POWER_LABELS[n]}"
+
+def scandir_recursive(path):
+    """
+    Recursively yields os.DirEntry objects for every regular file under path.
+    Directories are descended into but never yielded, so callers need no is_file filter.
+    Symlinks are not followed. Unreadable directories are reported and skipped.
+    """
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from scandir_recursive(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"⚠️  Skipping due to error: {e}")
 
 def run_command(command, cwd=None):
-    """Executes a shell command safely and returns its output."""
+    """
+    Executes a command given as an argv list and returns its output.
+    No shell is involved, so arguments are never re-split or expanded.
+    """
     try:
         result = subprocess.run(
             command,
-            shell=True,
+            shell=False,
             check=True,
             capture_output=True,
             text=True,
@@ -27,7 +53,7 @@ def run_command(command, cwd=None):
         )
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
-        print(f"Error executing command: {e.cmd}", file=sys.stderr)
+        print(f"Error executing command: {' '.join(e.cmd)}", file=sys.stderr)
         err_msg = f"{e.stderr.strip()}"
         print(f"{err_msg}", file=sys.stderr)
         return err_msg
@@ -37,19 +63,22 @@ def run_command(command, cwd=None):
 
 def get_git_state(target_dir="."):
     """Safely attempts to get the current Git repository state for a given directory."""
+    # Without a shell, a missing git binary would make run_command exit outright.
+    if shutil.which('git') is None:
+        return None, None, None
     try:
         target_path = str(target_dir)
         # Check if we are inside a git repository
-        run_command('git rev-parse --is-inside-work-tree', cwd=target_path)
+        run_command(['git', 'rev-parse', '--is-inside-work-tree'], cwd=target_path)
         
         # Get short commit ID
-        short_id = run_command('git rev-parse --short HEAD', cwd=target_path)
+        short_id = run_command(['git', 'rev-parse', '--short', 'HEAD'], cwd=target_path)
         
         # Get the commit message
-        commit_msg = run_command('git log -1 --pretty=%s', cwd=target_path)
+        commit_msg = run_command(['git', 'log', '-1', '--pretty=%s'], cwd=target_path)
         
         # Check for untracked or uncommitted changes
-        status = run_command('git status --porcelain', cwd=target_path)
+        status = run_command(['git', 'status', '--porcelain'], cwd=target_path)
         is_dirty = len(status) > 0
         
         return short_id, commit_msg, is_dirty
@@ -93,35 +122,100 @@ def summary(command_args, files_with_sizes, commit_id=None, target_dir="."):
     lines.append("=" * 80 + "\n")
     return "\n".join(lines)
 
+# Chunk size for the shutil.copyfileobj fallback when os.sendfile is unavailable.
+COPY_BUFFER_SIZE = 1 << 20
+
+# How many input files are opened ahead of the one currently being copied.
+READAHEAD_FILES = 16
+
+def _open_for_copy(file_path):
+    """Opens an input file and, where supported, asks the kernel to start reading it ahead."""
+    infile = open(file_path, 'rb')
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(infile.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+    return infile
+
+def _copy_file_contents(infile, outfile):
+    """
+    Streams infile into outfile without holding the whole file in memory.
+    On Linux os.sendfile copies kernel-side; elsewhere a 1 MiB buffered loop is used.
+    """
+    if sys.platform.startswith('linux') and hasattr(os, 'sendfile'):
+        outfile.flush()
+        in_fd, out_fd = infile.fileno(), outfile.fileno()
+        offset = 0
+        remaining = os.fstat(in_fd).st_size
+        try:
+            while remaining > 0:
+                sent = os.sendfile(out_fd, in_fd, offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+            return
+        except OSError:
+            # Some filesystems reject sendfile; finish the copy in user space.
+            infile.seek(offset)
+            outfile.seek(0, os.SEEK_END)
+    shutil.copyfileobj(infile, outfile, COPY_BUFFER_SIZE)
+
 def write_concatenated_artifact(output_file, file_items, summary_text):
     """
     Standardized writer for concatenated scripts.
     file_items should be a list of tuples: (display_path, absolute_file_path)
+    File contents are copied as raw bytes; only the generated text is encoded.
+    Upcoming files are opened on a small thread pool while the current one is copied,
+    so open/readahead latency on slow storage overlaps with output writes.
     """
+    def write_text(outfile, text):
+        outfile.write(text.encode('utf-8', errors='ignore'))
+
     print(f"\n📝 Writing files to '{output_file}'...")
     try:
-        with open(output_file, 'w', encoding='utf-8', errors='ignore') as outfile:
-            outfile.write(f"--- START OF FILE {output_file} ---\n\n")
-            outfile.write("# This file was generated by concatenating specified files and folders.\n")
-            outfile.write(f"# Total files included: {len(file_items)}\n\n")
+        with open(output_file, 'wb') as outfile:
+            write_text(outfile, f"--- START OF FILE {output_file} ---\n\n")
+            write_text(outfile, "# This file was generated by concatenating specified files and folders.\n")
+            write_text(outfile, f"# Total files included: {len(file_items)}\n\n")
             
-            for display_path, file_path in file_items:
-                header = "=" * 80 + "\n"
-                header += f"cat {display_path}\n"
-                header += "=" * 80 + "\n\n"
-                outfile.write(header)
-
+            with ThreadPoolExecutor(max_workers=READAHEAD_FILES) as executor:
+                # Opens stay READAHEAD_FILES ahead; output is still written in file_items order.
+                pending = deque(
+                    executor.submit(_open_for_copy, file_path)
+                    for _, file_path in file_items[:READAHEAD_FILES]
+                )
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as infile:
-                        outfile.write(infile.read())
-                except Exception as e:
-                    error_message = f"--> [Error] Could not read file '{display_path}': {e}\n"
-                    print(error_message, end='')
-                    outfile.write(error_message)
-                
-                outfile.write("\n\n")
+                    for index, (display_path, _) in enumerate(file_items):
+                        header = "=" * 80 + "\n"
+                        header += f"cat {display_path}\n"
+                        header += "=" * 80 + "\n\n"
+                        write_text(outfile, header)
+
+                        # Popped only after the header write, so a failed write leaves it in pending.
+                        future = pending.popleft()
+                        if index + READAHEAD_FILES < len(file_items):
+                            pending.append(executor.submit(_open_for_copy, file_items[index + READAHEAD_FILES][1]))
+
+                        try:
+                            with future.result() as infile:
+                                _copy_file_contents(infile, outfile)
+                        except Exception as e:
+                            error_message = f"--> [Error] Could not read file '{display_path}': {e}\n"
+                            print(error_message, end='')
+                            write_text(outfile, error_message)
+                        
+                        write_text(outfile, "\n\n")
+                finally:
+                    # Close inputs that were opened ahead but never copied (e.g. the output write failed).
+                    for future in pending:
+                        try:
+                            future.result().close()
+                        except Exception:
+                            pass
             
-            outfile.write(summary_text)
+            write_text(outfile, summary_text)
         print(f"✅ Success! Content concatenated into '{output_file}'.")
     except IOError as e:
         print(f"❌ Error: Could not write to output file '{output_file}': {e}")